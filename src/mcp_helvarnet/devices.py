@@ -6,11 +6,19 @@ Created on 2025-09-27 15:58:44 Saturday
 @author: Nikhil Kapila
 """
 
-from typing import Annotated, Dict, Any, List, Callable
+import asyncio
+import time
+from typing import Annotated, Dict, Any, List, Callable, Optional
 from pydantic import Field
 from fastmcp import FastMCP
 from aiohelvar import Router
 
+from aiohelvar.parser.command_type import CommandType, MessageType
+from aiohelvar.parser.command_parameter import CommandParameter, CommandParameterType
+from aiohelvar.parser.command import Command
+
+from .groups import _fetch_groups
+
 
 def register_device_tools(mcp: FastMCP, get_router: Callable[[], Router]):
     """Register all device control and info tools with the MCP server."""
@@ -141,6 +149,151 @@ def register_device_tools(mcp: FastMCP, get_router: Callable[[], Router]):
         except Exception as e:
             return {"error": str(e)}
 
+    @mcp.tool()
+    async def refresh_devices(
+        addresses: Annotated[Optional[List[str]], Field(description="Device addresses to refresh, e.g. ['1.1.2.3', '1.1.2.4']")] = None,
+        subnet: Annotated[Optional[str], Field(description="Subnet prefix to refresh, e.g. '1.1.2.*' for every device on block 1, router 1, subnet 2")] = None,
+        group_id: Annotated[Optional[str], Field(description="Group ID number or group name whose devices should be refreshed. Examples: '3', 'Kitchen'")] = None,
+        max_in_flight: Annotated[int, Field(description="Maximum number of queries waiting on the router at once", ge=1, le=256)] = 32
+    ) -> Dict[str, Any]:
+        """Re-read state and brightness for a set of devices from the router.
+        
+        Device data is only read once on startup, so use this to pick up changes
+        made by wall panels, sensors or other controllers. Select devices by
+        address list, subnet prefix or group; queries are pipelined so a whole
+        subnet refreshes in seconds. Brightness is only read for loads, panels
+        and sensors just get their state. Devices with a failed query are left
+        untouched and listed under 'failed'.
+        """
+        try:
+            router = get_router()
+            if not any([addresses, subnet, group_id]):
+                return {"error": "Please specify addresses, a subnet prefix or a group to refresh."}
+
+            devices = _select_devices(router, addresses, subnet)
+            if group_id:
+                devices.update(await _fetch_group_devices(router, group_id))
+
+            if not devices:
+                return {"error": "No devices matched the given selection."}
+
+            return await _refresh_devices_internal(router, list(devices.values()), max_in_flight)
+
+        except Exception as e:
+            return {"error": str(e)}
+
+def _select_devices(router, addresses, subnet):
+    """
+    Internal function to pick devices by address list and/or subnet prefix like '1.1.2.*'.
+    """
+    selected = {}
+    wanted = {a.strip().lstrip('@') for a in addresses or []}
+    prefix = subnet.strip().lstrip('@').rstrip('*').rstrip('.') + '.' if subnet else None
+
+    for dev in router.devices.devices.values():
+        # aiohelvar prints addresses as '@1.1.2.3', callers may or may not include the '@'
+        key = str(dev.address).lstrip('@')
+        if key in wanted or (prefix and key.startswith(prefix)):
+            selected[key] = dev
+
+    return selected
+
+async def _query_result(router, command):
+    """
+    Internal function to send a query and return its result, raising if the router didn't answer it.
+    """
+    response = await router._send_command_task(command)
+    name = command.command_type.name
+
+    if response is None:
+        raise RuntimeError(f"no response to {name}")
+    if response.command_message_type == MessageType.ERROR:
+        raise RuntimeError(f"router returned error {response.result} to {name}")
+    if not response.result:
+        raise RuntimeError(f"empty response to {name}")
+
+    return response.result
+
+async def _fetch_group_devices(router, group_id):
+    """
+    Internal function to get the devices belonging to a group (by number or name).
+    """
+    if not group_id.isdigit():
+        gdict = await _fetch_groups(router)
+        gdict = [k for k,v in gdict.items() if v['name']==group_id]
+        if (len(gdict)==0):
+            raise ValueError("Sorry, not able to find the group by name, please specify group number.")
+        group_id = gdict[0] # always assume we get only exact match
+
+    # result is a list of device addresses like '@1.1.2.3,@1.1.2.4'
+    result = await _query_result(
+        router,
+        Command(
+            CommandType.QUERY_GROUP,
+            [CommandParameter(CommandParameterType.GROUP, group_id)],
+        )
+    )
+
+    members = [a.strip() for a in result.split(',') if a.strip()]
+    return _select_devices(router, members, None)
+
+async def _refresh_devices_internal(router, devices, max_in_flight):
+    """
+    Internal function to pipeline state and load level queries for devices.
+
+    Queries for every device are issued up front and a semaphore caps how
+    many are waiting on the router at once, instead of one round-trip at a time.
+    Like aiohelvar's own Devices.update_device, load level is only queried for
+    loads; panels and sensors only have their state refreshed. A device is only
+    updated when all of its queries succeed.
+    """
+    window = asyncio.Semaphore(max_in_flight)
+
+    async def _query(command_type, device):
+        async with window:
+            return await _query_result(router, Command(command_type, command_address=device.address))
+
+    async def _refresh_one(device):
+        if not device.is_load:
+            state = int(await _query(CommandType.QUERY_DEVICE_STATE, device))
+            changed = int(device.state) != state
+            await router.devices.update_device_state(device.address, state)
+            return changed
+
+        state, load_level = await asyncio.gather(
+            _query(CommandType.QUERY_DEVICE_STATE, device),
+            _query(CommandType.QUERY_DEVICE_LOAD_LEVEL, device),
+        )
+        state, load_level = int(state), float(load_level)
+
+        changed = (int(device.state), float(device.load_level)) != (state, load_level)
+        await router.devices.update_device_state(device.address, state)
+        await router.devices.update_device_load_level(device.address, load_level)
+        return changed
+
+    started = time.monotonic()
+    results = await asyncio.gather(*[_refresh_one(device) for device in devices], return_exceptions=True)
+    elapsed = time.monotonic() - started
+
+    changed = []
+    failed = {}
+    for device, result in zip(devices, results):
+        address_str = str(device.address).lstrip('@')
+        if isinstance(result, BaseException):
+            failed[address_str] = str(result)
+        elif result:
+            changed.append(address_str)
+
+    refreshed = len(devices) - len(failed)
+    return {
+        'refreshed': refreshed,
+        'changed': len(changed),
+        'changed_devices': changed,
+        'failed': failed,
+        'elapsed_seconds': round(elapsed, 3),
+        'summary': f"Refreshed {refreshed}/{len(devices)} devices in {elapsed:.2f}s, {len(changed)} changed, {len(failed)} failed"
+    }
+
 def _get_device_overview_internal(device):
     """
     Internal function to get device overview (your original function logic).
@@ -23,34 +23,35 @@ from aiohelvar.parser.command_parameter import CommandParameter, CommandParamete
 from aiohelvar.parser.command import Command
 
 
-def register_group_tools(mcp: FastMCP, get_router: Callable[[], Router]):
-    """Register all group control and info tools with the MCP server."""
-
-    async def _fetch_groups(router)->Dict[str, Dict[str,str]]:
-        """Fetch all available lighting groups and their descriptions."""
-        
-        response = await router._send_command_task(Command(CommandType.QUERY_GROUPS))
-        group_ids = response.result.split(",")
-        groups={}
-        
-        for group_id in group_ids:
-            group_id = group_id.strip()
-            if group_id: 
-                int(group_id)
-
-                group_name = await router._send_command_task(
-                    Command(
-                        CommandType.QUERY_GROUP_DESCRIPTION,
-                        [CommandParameter(CommandParameterType.GROUP, group_id)],
-                        )
+async def _fetch_groups(router)->Dict[str, Dict[str,str]]:
+    """Fetch all available lighting groups and their descriptions."""
+    
+    response = await router._send_command_task(Command(CommandType.QUERY_GROUPS))
+    group_ids = response.result.split(",")
+    groups={}
+    
+    for group_id in group_ids:
+        group_id = group_id.strip()
+        if group_id: 
+            int(group_id)
+
+            group_name = await router._send_command_task(
+                Command(
+                    CommandType.QUERY_GROUP_DESCRIPTION,
+                    [CommandParameter(CommandParameterType.GROUP, group_id)],
                     )
+                )
+
+            groups[group_id] = {
+                "group_number": group_id,
+                "name": group_name.result
+                }
+
+    return groups
 
-                groups[group_id] = {
-                    "group_number": group_id,
-                    "name": group_name.result
-                    }
 
-        return groups
+def register_group_tools(mcp: FastMCP, get_router: Callable[[], Router]):
+    """Register all group control and info tools with the MCP server."""
 
     async def _set_group_level_to_pct(
         router: Router, 
@@ -0,0 +1,153 @@
+import asyncio
+import random
+
+from aiohelvar.devices import Device, Devices
+from aiohelvar.parser.address import HelvarAddress
+from aiohelvar.parser.command import Command
+from aiohelvar.parser.command_type import CommandType, MessageType
+
+from mcp_helvarnet.devices import _fetch_group_devices, _refresh_devices_internal, _select_devices
+
+
+class PlainAddress:
+    """Address that prints without the leading '@' aiohelvar uses."""
+
+    def __init__(self, block, router, subnet, device):
+        self.block, self.router, self.subnet, self.device = block, router, subnet, device
+
+    def __str__(self):
+        return f"{self.block}.{self.router}.{self.subnet}.{self.device}"
+
+
+class FakeRouter:
+    """Answers device and group queries after a delay, recording how many overlap."""
+
+    def __init__(self, addresses, delay=0.0, jitter=0.0, groups=None, errors=None):
+        self.devices = Devices(self)
+        for address in addresses:
+            self.devices.register_device(Device(address))
+        self.delay = delay
+        self.jitter = jitter
+        self.random = random.Random(0)
+        self.group_members = groups or {}
+        self.errors = errors or {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sent = 0
+
+    async def _send_command_task(self, command):
+        self.sent += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay + self.random.uniform(0, self.jitter))
+        finally:
+            self.in_flight -= 1
+
+        key = (command.command_type, str(command.command_address).lstrip('@'))
+        if key in self.errors:
+            return self.errors[key]
+
+        if command.command_type == CommandType.QUERY_GROUPS:
+            return Command(command.command_type, command_result=",".join(self.group_members))
+        if command.command_type == CommandType.QUERY_GROUP_DESCRIPTION:
+            group_id = command.command_parameters[0].argument
+            return Command(command.command_type, command_result=self.group_members[group_id][0])
+        if command.command_type == CommandType.QUERY_GROUP:
+            group_id = command.command_parameters[0].argument
+            return Command(command.command_type, command_result=",".join(self.group_members[group_id][1]))
+
+        # answers encode the device number so mixed up results are easy to spot
+        device = command.command_address.device
+        if command.command_type == CommandType.QUERY_DEVICE_STATE:
+            return Command(command.command_type, command_address=command.command_address, command_result=str(device))
+        return Command(command.command_type, command_address=command.command_address, command_result=f"{device * 1.5}")
+
+
+def _addresses(subnet, count, address_type=HelvarAddress):
+    return [address_type(1, 1, subnet, device) for device in range(1, count + 1)]
+
+
+def test_select_devices_matches_with_and_without_at():
+    for address_type in (HelvarAddress, PlainAddress):
+        router = FakeRouter(_addresses(2, 3, address_type) + _addresses(3, 2, address_type))
+
+        assert sorted(_select_devices(router, ['1.1.2.1', '@1.1.3.2'], None)) == ['1.1.2.1', '1.1.3.2']
+        assert sorted(_select_devices(router, None, '1.1.2.*')) == ['1.1.2.1', '1.1.2.2', '1.1.2.3']
+        assert sorted(_select_devices(router, None, '@1.1.3.*')) == ['1.1.3.1', '1.1.3.2']
+        assert _select_devices(router, ['1.1.9.9'], '1.1.4.*') == {}
+
+
+def test_fetch_group_devices_by_number_and_name():
+    groups = {'5': ('Kitchen', ['@1.1.2.1', '@1.1.3.2'])}
+    for address_type in (HelvarAddress, PlainAddress):
+        router = FakeRouter(_addresses(2, 3, address_type) + _addresses(3, 2, address_type), groups=groups)
+
+        assert sorted(asyncio.run(_fetch_group_devices(router, '5'))) == ['1.1.2.1', '1.1.3.2']
+        assert sorted(asyncio.run(_fetch_group_devices(router, 'Kitchen'))) == ['1.1.2.1', '1.1.3.2']
+
+
+def test_refresh_pipelines_queries_and_applies_results_to_right_devices():
+    router = FakeRouter(_addresses(2, 64), delay=0.05, jitter=0.02)
+    devices = list(router.devices.devices.values())
+
+    result = asyncio.run(_refresh_devices_internal(router, devices, max_in_flight=32))
+
+    # all 128 queries go out, with the window full rather than one at a time
+    assert router.sent == 128
+    assert router.max_in_flight == 32
+
+    assert result['refreshed'] == 64
+    assert result['changed'] == 64
+    assert result['failed'] == {}
+    for device in devices:
+        assert device.state == device.address.device
+        assert device.load_level == device.address.device * 1.5
+
+    # a second pass reads back the same values, so nothing changes
+    result = asyncio.run(_refresh_devices_internal(router, devices, max_in_flight=32))
+    assert result['refreshed'] == 64
+    assert result['changed'] == 0
+
+
+def test_refresh_skips_devices_with_failed_queries():
+    error = Command(CommandType.QUERY_DEVICE_LOAD_LEVEL, command_message_type=MessageType.ERROR, command_result="27")
+    router = FakeRouter(
+        _addresses(2, 3),
+        errors={
+            (CommandType.QUERY_DEVICE_LOAD_LEVEL, '1.1.2.2'): error,
+            (CommandType.QUERY_DEVICE_STATE, '1.1.2.3'): None,
+        },
+    )
+    devices = list(router.devices.devices.values())
+
+    result = asyncio.run(_refresh_devices_internal(router, devices, max_in_flight=4))
+
+    assert result['refreshed'] == 1
+    assert result['changed_devices'] == ['1.1.2.1']
+    assert result['failed'] == {
+        '1.1.2.2': 'router returned error 27 to QUERY_DEVICE_LOAD_LEVEL',
+        '1.1.2.3': 'no response to QUERY_DEVICE_STATE',
+    }
+    # the successful state query on 1.1.2.2 is not applied on its own
+    assert (devices[1].state, devices[1].load_level) == (0, 0.0)
+    assert (devices[2].state, devices[2].load_level) == (0, 0.0)
+
+
+def test_refresh_only_reads_state_for_non_load_devices():
+    error = Command(CommandType.QUERY_DEVICE_LOAD_LEVEL, command_message_type=MessageType.ERROR, command_result="27")
+    router = FakeRouter(_addresses(2, 2), errors={(CommandType.QUERY_DEVICE_LOAD_LEVEL, '1.1.2.2'): error})
+    devices = list(router.devices.devices.values())
+
+    # a DIGIDIM device of unknown type, like a panel, is not a load
+    panel = devices[1]
+    panel.protocol = "DIGIDIM"
+    assert not panel.is_load
+
+    result = asyncio.run(_refresh_devices_internal(router, devices, max_in_flight=4))
+
+    assert router.sent == 3
+    assert result['refreshed'] == 2
+    assert result['changed_devices'] == ['1.1.2.1', '1.1.2.2']
+    assert result['failed'] == {}
+    assert (panel.state, panel.load_level) == (2, 0.0)